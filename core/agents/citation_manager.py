@@ -1,5 +1,4 @@
-from typing import List, Dict, Tuple
-import re
+from typing import List, Dict, Optional
 import hashlib
 from core.models.state import Source, CitedContent
 
@@ -14,27 +13,38 @@ class CitationManager:
         self.source_registry: Dict[str, Source] = {}
         self.citation_counter = 1
         self.url_to_id: Dict[str, str] = {}
+        self.id_to_number: Dict[str, int] = {}
+        self.sorted_ids: List[str] = []  # IDs are assigned monotonically, so insertion order is sorted
+        self._sources_list_cache: Optional[str] = None  # Cleared whenever the registry changes
 
 
     def add_source(self, source: Source) -> str:
         """Add a source and return its citation ID, reusing if URL exists"""
-        for existing_id, existing in self.source_registry.items():
-            if existing.url == source.url:
-                return existing_id  # Reuse existing ID for duplicate URL
+        if source.url in self.url_to_id:
+            return self.url_to_id[source.url]  # Reuse existing ID for duplicate URL
         source_id = f"src_{self.citation_counter}"
         self.source_registry[source_id] = source
+        self.url_to_id[source.url] = source_id
+        self.id_to_number[source_id] = self.citation_counter
+        self.sorted_ids.append(source_id)
         self.citation_counter += 1
+        self._sources_list_cache = None
         return source_id
 
+    def load_sources(self, sources: Dict[str, Source]):
+        """Load an already-deduplicated registry (e.g. state["sources"]) without re-adding each source"""
+        self.source_registry = dict(sources)
+        self.sorted_ids = list(self.source_registry)
+        self.url_to_id = {source.url: source_id for source_id, source in self.source_registry.items()}
+        self.id_to_number = {source_id: i for i, source_id in enumerate(self.sorted_ids, 1)}
+        self.citation_counter = len(self.sorted_ids) + 1
+        self._sources_list_cache = None
+
     def create_cited_content(self, content: str, source_ids: List[str]) -> CitedContent:
         """Create content with embedded citations"""
-        cited_content = content
-
-        # Add citation markers
-        for i, source_id in enumerate(source_ids):
-            citation_marker = f"[{self.get_citation_number(source_id)}]"
-            # Insert citation at end of relevant sentences
-            cited_content = self.insert_citations(cited_content, citation_marker)
+        # Build all citation markers, then insert them in a single pass
+        citation_markers = self.format_citation_markers(source_ids)
+        cited_content = self.insert_citations(content, citation_markers) if source_ids else content
 
         return CitedContent(
             content=cited_content,
@@ -42,39 +52,33 @@ class CitationManager:
             confidence=self.calculate_confidence(source_ids)
         )
 
+    def format_citation_markers(self, source_ids: List[str]) -> str:
+        """Format the inline citation markers for the given sources, e.g. [1][2]"""
+        return "".join(f"[{self.get_citation_number(source_id)}]" for source_id in source_ids)
+
     def get_citation_number(self, source_id: str) -> int:
         """Get the display number for a citation"""
-        source_ids = list(self.source_registry.keys())
-        return source_ids.index(source_id) + 1 if source_id in source_ids else 0
+        return self.id_to_number.get(source_id, 0)
 
     def insert_citations(self, text: str, citation: str) -> str:
-        """Insert citations at appropriate positions in text"""
-        sentences = re.split(r'(?<=[.!?])\s+', text)
-        if sentences:
-            sentences[-1] += citation
-        return ' '.join(sentences)
+        """Insert citations after the last sentence of text"""
+        # Keep the text's own whitespace (paragraphs, headings) so the stored response
+        # starts with exactly what was streamed to the user
+        return text + citation
 
     def format_sources_list(self) -> str:
         """Format sources for display, capped at 10 unique, sorted by ID"""
+        if self._sources_list_cache is not None:
+            return self._sources_list_cache
+
+        # URLs are unique in the registry (enforced by add_source via url_to_id)
+        parts = ["\n\n**Sources:**"]
+        for count, source_id in enumerate(self.sorted_ids[:10], 1):
+            source = self.source_registry[source_id]
+            parts.append(f"{count}. [{source.title}]({source.url}) - {source.domain}")
+        sources_text = "\n".join(parts) + "\n"
 
-        def get_id_number(item):
-            try:
-                # item is a tuple (source_id, source); access source_id with item[0]
-                id_str = item[0]  # e.g., 'src_1'
-                number_part = id_str.split('_')[1]  # e.g., '1'
-                return int(number_part)  # e.g., 1
-            except (IndexError, ValueError, AttributeError):
-                return float('inf')  # Push invalid items to the end (safe fallback)
-
-        sorted_sources = sorted(self.source_registry.items(), key=get_id_number)
-        sources_text = "\n\n**Sources:**\n"
-        seen_urls = set()  # Extra dedup for safety
-        count = 0
-        for source_id, source in sorted_sources:
-            if source.url not in seen_urls and count < 10:
-                count += 1
-                sources_text += f"{count}. [{source.title}]({source.url}) - {source.domain}\n"
-                seen_urls.add(source.url)
+        self._sources_list_cache = sources_text
         return sources_text
 
     def calculate_confidence(self, source_ids: List[str]) -> float:
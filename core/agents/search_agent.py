@@ -1,37 +1,85 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator
+from collections import OrderedDict
+import asyncio
+import re
 from langchain_tavily import TavilySearch
 from langchain_groq import ChatGroq
+from core.llm import LLM
 from core.models.state import AgentState, Source, SearchResult
 from core.agents.citation_manager import CitationManager
 from datetime import datetime
 from dotenv import load_dotenv
-from urllib.parse import urlparse
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from functools import lru_cache
 
 load_dotenv()
 
+QUERY_CACHE_SIZE = 128
+_SIMPLE_QUERY_RE = re.compile(r'^(what|who|when)\s+is\b', re.IGNORECASE)
+
 class SearchAgent:
-    def __init__(self):
-        self.llm = ChatGroq(model="openai/gpt-oss-120b")
+    def __init__(self, llm: ChatGroq = LLM):
+        self.llm = llm
         self.tavily = TavilySearch(max_results=5, search_depth="advanced")
         self.citation_manager = CitationManager()
-        self.citation_manager.reset()
+        self.query_cache: OrderedDict[str, List[str]] = OrderedDict()  # Normalized query -> generated sub-queries (LRU)
 
-    def search_and_analyze(self, state: AgentState):
+    async def search_and_analyze(self, state: AgentState):
         """Main search and analysis pipeline"""
         self.citation_manager.reset()  # Clear for this query
+        self.seen_urls: set[str] = set()  # URLs already returned by an earlier sub-query
         query = state["current_query"]
 
-        # 1. generate search queries
-        search_queries = self.generate_search_queries(query)
-        search_queries = [query] + search_queries
+        # 1. generate search queries, starting each search as soon as its query is parsed
+        search_tasks = {}
+
+        def start_search(search_query: str):
+            if search_query not in search_tasks:  # Drop exact-duplicate queries
+                search_tasks[search_query] = asyncio.create_task(self.tavily.ainvoke(search_query))
+
+        start_search(query)
+        if not self.is_simple_query(query):
+            cache_key = " ".join(query.lower().split())
+            if cache_key in self.query_cache:
+                self.query_cache.move_to_end(cache_key)
+                for search_query in self.query_cache[cache_key]:
+                    start_search(search_query)
+            else:
+                # Query generation uses the sync LLM client in a worker thread: the shared client's
+                # async pool would be bound to this per-query event loop and break on the next query
+                loop = asyncio.get_running_loop()
+                parsed_queries: asyncio.Queue = asyncio.Queue()
+
+                def produce_queries():
+                    try:
+                        for search_query in self.generate_search_queries(query):
+                            loop.call_soon_threadsafe(parsed_queries.put_nowait, search_query)
+                    finally:
+                        loop.call_soon_threadsafe(parsed_queries.put_nowait, None)
+
+                producer = asyncio.create_task(asyncio.to_thread(produce_queries))
+                generated_queries = []
+                while (search_query := await parsed_queries.get()) is not None:
+                    generated_queries.append(search_query)
+                    start_search(search_query)
+                await producer  # Re-raise any LLM error from the worker thread
+                self.query_cache[cache_key] = generated_queries
+                if len(self.query_cache) > QUERY_CACHE_SIZE:
+                    self.query_cache.popitem(last=False)  # Evict the least recently used query
+        search_queries = list(search_tasks)
         print("Search queries:", search_queries)
 
-        # 2. Execute searches
+        # 2. Collect the concurrently running searches
         all_sources = []
         search_results = []
 
-        for search_query in search_queries:
-            results = self.tavily.invoke(search_query)
+        results_list = await asyncio.gather(*search_tasks.values())
+
+        for search_query, results in zip(search_queries, results_list):
+            if isinstance(results, dict) and "results" in results:
+                results["results"] = [r for r in results["results"]
+                                      if self.normalize_url(r.get("url", "")) not in self.seen_urls]
+                self.seen_urls.update(self.normalize_url(r.get("url", "")) for r in results["results"])
             sources = self.process_search_results(results, search_query)
             all_sources.extend(sources)
 
@@ -62,8 +110,13 @@ class SearchAgent:
             "processing_stage": "search_complete"
         }
 
-    def generate_search_queries(self, original_query: str) -> List[str]:
-        """Generate multiple search queries for comprehensive coverage"""
+    @staticmethod
+    def is_simple_query(query: str) -> bool:
+        """Short factual queries gain nothing from sub-query expansion"""
+        return len(query.split()) <= 4 or bool(_SIMPLE_QUERY_RE.match(query))
+
+    def generate_search_queries(self, original_query: str) -> Iterator[str]:
+        """Generate multiple search queries for comprehensive coverage, yielding each as its line completes"""
 
         prompt = f"""
         You are a search query generator. 
@@ -93,16 +146,26 @@ class SearchAgent:
         - Return ONLY the list of 5 queries, one per line, in the same order as categories.
         """
 
-        response = self.llm.invoke([{"role": "user", "content": prompt}])
-        queries = [q.strip() for q in response.content.split('\n') if q.strip()]
-
-        return queries[:5]
-
-    def extract_domain(self, url: str) -> str:
+        buffer = ""
+        count = 0
+        for chunk in self.llm.stream([{"role": "user", "content": prompt}]):
+            buffer += chunk.content
+            *lines, buffer = buffer.split('\n')
+            for line in lines:
+                if line.strip() and count < 5:
+                    count += 1
+                    yield line.strip()
+
+        if buffer.strip() and count < 5:
+            yield buffer.strip()
+
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def extract_domain(url: str) -> str:
         """Extract domain from URL"""
         try:
-            return urlparse(url).netloc
-        except:
+            return urlsplit(url).netloc
+        except ValueError:
             return "unknown"
 
     def process_search_results(self, results: Any, query: str) -> List[Source]:
@@ -128,15 +191,42 @@ class SearchAgent:
                     sources.append(source)
         return sources
 
-    def deduplicate_sources(self, sources: List[Source]) -> List[Source]:
-        """Remove duplicate sources based on URL"""
+    @staticmethod
+    def normalize_url(url: str) -> str:
+        """Normalize a URL for duplicate detection: lowercase host, drop utm_* params and trailing slash"""
+        try:
+            parts = urlsplit(url)
+        except ValueError:
+            return url
+        query = urlencode([(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                           if not k.lower().startswith("utm_")])
+        return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip("/"), query, ""))
+
+    @staticmethod
+    def shingles(text: str, k: int = 5) -> set:
+        """Character k-shingles of the start of a snippet, used for near-duplicate detection"""
+        text = " ".join(text[:400].lower().split())
+        return {text[i:i + k] for i in range(len(text) - k + 1)}
+
+    def deduplicate_sources(self, sources: List[Source], threshold: float = 0.8) -> List[Source]:
+        """Remove duplicate sources based on normalized URL and near-identical snippets"""
         seen_urls = set()
+        seen_shingles = []
         unique_sources = []
 
         for source in sources:
-            if source.url not in seen_urls:
-                seen_urls.add(source.url)
-                unique_sources.append(source)
+            url = self.normalize_url(source.url)
+            if url in seen_urls:
+                continue
+
+            # Mirrored/alternate URLs of the same article have near-identical snippets
+            shingles = self.shingles(source.snippet)
+            if shingles and any(len(shingles & other) >= threshold * len(shingles | other) for other in seen_shingles):
+                continue
+
+            seen_urls.add(url)
+            seen_shingles.append(shingles)
+            unique_sources.append(source)
 
         return unique_sources
 
@@ -151,10 +241,11 @@ class SearchAgent:
             'medium.com': 0.7,
         }
 
+        # Keep the original Tavily relevance_score intact; store the adjusted score separately
         for source in sources:
             domain_weight = domain_weights.get(source.domain, 0.5)
-            source.relevance_score = (source.relevance_score + domain_weight) / 2
+            source.ranked_score = (source.relevance_score + domain_weight) / 2
 
-        return sorted(sources, key=lambda x: x.relevance_score, reverse=True)
+        return sorted(sources, key=lambda x: x.ranked_score, reverse=True)
 
 
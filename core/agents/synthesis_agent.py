@@ -1,14 +1,19 @@
 from typing import List, Dict, Any
+from itertools import islice
 from langchain_groq import ChatGroq
-from core.models.state import AgentState, CitedContent
+from core.llm import LLM
+from core.models.state import AgentState, CitedContent, Source
 from core.agents.citation_manager import CitationManager
+from dataclasses import replace
+
+# Approximate token budget for all source snippets in the synthesis context (~4 chars per token)
+TOKEN_BUDGET = 1000
 
 
 class SynthesisAgent:
-    def __init__(self):
-        self.llm = ChatGroq(model="openai/gpt-oss-120b")
+    def __init__(self, llm: ChatGroq = LLM):
+        self.llm = llm
         self.citation_manager = CitationManager()
-        self.citation_manager.reset()
 
     def synthesize_response(self, state: AgentState) -> Dict[str, Any]:
         """Synthesize information from sources into a comprehensive response"""
@@ -16,13 +21,11 @@ class SynthesisAgent:
         query = state["current_query"]
         sources = state["sources"]
 
-        # Load sources fresh (dedup happens here via add_source)
-        self.citation_manager.source_registry = {}
-        for source in sources.values():  # Re-add to ensure dedup
-            self.citation_manager.add_source(source)
+        # Load sources fresh (already keyed by source_id and deduplicated by the search agent)
+        self.citation_manager.load_sources(sources)
 
         # create context from source
-        context_text = self.build_context_from_sources(self.citation_manager.source_registry)
+        context_text = self.build_context_from_sources(self.budget_snippets(self.citation_manager.source_registry))
 
 
         # Generate synthesized response
@@ -50,11 +53,12 @@ class SynthesisAgent:
         Sources context: {context_text}
         """
 
+        # Under app.stream(stream_mode="messages") LangGraph streams these tokens to the caller
         response = self.llm.invoke([{"role": "user", "content": synthesis_prompt}])
         synthesized_text = response.content
 
         # Create cited content (limit to top sources)
-        top_source_ids = list(self.citation_manager.source_registry.keys())[:5]  # Cap for citation
+        top_source_ids = list(islice(self.citation_manager.source_registry, 5))  # Cap for citation
         cited_content = self.citation_manager.create_cited_content(synthesized_text, top_source_ids)
 
         final_response = self.format_final_response(cited_content, self.citation_manager)
@@ -64,19 +68,33 @@ class SynthesisAgent:
             "processing_stage": "synthesis_complete"
         }
 
+    def budget_snippets(self, sources: Dict[str, Source]) -> Dict[str, Source]:
+        """Truncate snippets to fit TOKEN_BUDGET, giving higher-ranked sources a larger share"""
+        if not sources:
+            return sources
+
+        chars_per_source = TOKEN_BUDGET * 4 // len(sources)
+        # Copies, so the sources kept in the graph state are left untouched
+        return {
+            source_id: replace(source, snippet=source.snippet[:int(chars_per_source * 2 * 0.8 ** i)])
+            for i, (source_id, source) in enumerate(sources.items())
+        }
+
     def build_context_from_sources(self, sources: Dict[str, Any]) -> str:
         """Build detailed context string from sources"""
-        context = "SOURCES FOR SYNTHESIS:\n\n"
+        # Keep the context lean: every character here is sent to the LLM as tokens
+        parts = ["SOURCES FOR SYNTHESIS:\n\n"]
         for i, (source_id, source) in enumerate(sources.items(), 1):
-            context += f"## Source {i} - {source.domain}\n"
-            context += f"**Title:** {source.title}\n"
-            context += f"**Content:** {source.snippet}\n"
-            context += f"**URL:** {source.url}\n"
-            context += f"**Relevance Score:** {source.relevance_score:.2f}\n"
-            context += "-" * 80 + "\n\n"
-
-        context += "SYNTHESIS INSTRUCTIONS: Use this information to create a comprehensive, detailed response that covers all aspects of the query. Draw connections between sources and provide deep explanations.\n"
-        return context
+            parts.append(
+                f"## Source {i} - {source.domain}\n"
+                f"**Title:** {source.title}\n"
+                f"**Content:** {source.snippet}\n"
+                f"**URL:** {source.url}\n"
+                "---\n\n"
+            )
+
+        parts.append("SYNTHESIS INSTRUCTIONS: Use this information to create a comprehensive, detailed response that covers all aspects of the query. Draw connections between sources and provide deep explanations.\n")
+        return "".join(parts)
 
     def format_final_response(self, cited_content: CitedContent, citation_manager: CitationManager) -> str:
         """Format the final response with sources"""
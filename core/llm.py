@@ -0,0 +1,7 @@
+from langchain_groq import ChatGroq
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Shared client so all agents reuse one HTTP connection pool
+LLM = ChatGroq(model="openai/gpt-oss-120b", max_retries=2)
@@ -1,9 +1,10 @@
 from typing import TypedDict, List, Dict, Optional, Annotated
 from langgraph.graph import add_messages
-from pydantic import BaseModel
+from dataclasses import dataclass
 from datetime import datetime
 
-class Source(BaseModel):
+@dataclass(slots=True)
+class Source:
     id: str
     url: str
     title: str
@@ -11,14 +12,17 @@ class Source(BaseModel):
     domain: str
     timestamp: datetime
     relevance_score: float
+    ranked_score: float = 0.0
 
-class SearchResult(BaseModel):
+@dataclass(slots=True)
+class SearchResult:
     query: str
     sources: List[Source]
     total_results: int
     search_time: datetime
 
-class CitedContent(BaseModel):
+@dataclass(slots=True)
+class CitedContent:
     content: str
     source_ids: List[str]
     confidence: float
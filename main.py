@@ -3,21 +3,25 @@ from core.agents.citation_manager import CitationManager
 from core.agents.synthesis_agent import SynthesisAgent
 from core.models.state import AgentState
 from langgraph.graph import StateGraph, END
-from langchain_groq import ChatGroq
-from langchain_core.messages import HumanMessage, AIMessage
+from core.llm import LLM
+from langchain_core.messages import HumanMessage, AIMessage, AIMessageChunk
 from langgraph.checkpoint.sqlite import SqliteSaver
 import sqlite3
+import asyncio
 from dotenv import load_dotenv
 
 load_dotenv()
 
 # Initialize components
-llm = ChatGroq(model="openai/gpt-oss-120b")
-search_agent = SearchAgent()
-synthesis_agent = SynthesisAgent()
+search_agent = SearchAgent(llm=LLM)
+synthesis_agent = SynthesisAgent(llm=LLM)
 
 # Database
 sqlite_conn = sqlite3.connect("database/checkpoint.sqlite", check_same_thread=False)
+# WAL + NORMAL sync batches checkpoint fsyncs instead of syncing on every commit
+sqlite_conn.execute("PRAGMA journal_mode=WAL")
+sqlite_conn.execute("PRAGMA synchronous=NORMAL")
+sqlite_conn.execute("PRAGMA temp_store=MEMORY")
 memory = SqliteSaver(sqlite_conn)
 
 def router_node(state: AgentState):
@@ -31,7 +35,7 @@ def router_node(state: AgentState):
 
 def search_node(state: AgentState):
     """Handle search and source gathering"""
-    search_results = search_agent.search_and_analyze(state)
+    search_results = asyncio.run(search_agent.search_and_analyze(state))
     return {**state, **search_results}
 
 
@@ -87,17 +91,28 @@ if __name__ == "__main__":
 
             print("\n🔍 Searching and analyzing...")
 
-            result = app.invoke({
+            # Stream synthesis tokens as they are generated
+            streamed = []
+            for chunk, metadata in app.stream({
                 "messages": [HumanMessage(content=query)],
                 "search_results": [],
                 "sources": {},
                 "synthesized_content": [],
                 "current_query": "",
                 "processing_stage": "initialized"
-            }, config=config)
-
-            final_message = result["messages"][-1]
-            print(f"\n🤖 AI: {final_message.content}")
+            }, config=config, stream_mode="messages"):
+                if metadata.get("langgraph_node") == "synthesis" and isinstance(chunk, AIMessageChunk):
+                    if not streamed:
+                        print("\n🤖 AI: ", end="")
+                    streamed.append(chunk.content)
+                    print(chunk.content, end="", flush=True)
+
+            # The stored response is the streamed text followed by citations and sources
+            final_message = app.get_state(config).values["messages"][-1]
+            if streamed:
+                print(final_message.content[len("".join(streamed)):])
+            else:
+                print(f"\n🤖 AI: {final_message.content}")
             print("=" * 60)
 
         except KeyboardInterrupt: